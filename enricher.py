@@ -8,23 +8,65 @@ by querying YouTube Music.
 Usage:
     python enricher.py /path/to/music/folder
     python enricher.py /path/to/music/folder --dry-run
-    python enricher.py --daemon  # runs continuously with SCAN_INTERVAL
+    python enricher.py --daemon  # watches for new files, full scan every SCAN_INTERVAL
 
 Environment variables:
     MUSIC_FOLDER: Path to music folder (default: /music)
-    SCAN_INTERVAL: Seconds between scans in daemon mode (default: 3600 = 1 hour)
+    SCAN_INTERVAL: Seconds between full scans in daemon mode (default: 86400 = 24 hours)
+    WATCH: Set to false to disable watching for new files in daemon mode (default: true)
+    CONCURRENCY: Number of parallel YouTube Music lookups (default: 8)
+    RATE_LIMIT: Maximum YouTube Music requests per second (default: 4)
+    CACHE_DB: Path to the lookup cache database (default: ~/.cache/ytmusic_enricher.db)
 """
 
 import argparse
+import json
 import os
+import queue
+import random
 import re
+import shutil
+import signal
+import sqlite3
+import string
+import threading
 import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from datetime import datetime
+from functools import partial
+from itertools import islice
 from pathlib import Path
 
+import requests
 from mutagen.id3 import ID3, TRCK, ID3NoHeaderError
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from watchdog.events import FileSystemEventHandler
+from watchdog.observers import Observer
 from ytmusicapi import YTMusic
 
+# Worker threads for the first pass; it is bound by stat/read syscalls, not CPU
+SCAN_WORKERS = 32
+
+# Responses that mean YouTube Music wants us to slow down
+THROTTLE_STATUSES = {429, 503}
+
+# Suffix of the temporary copy written by write_tags
+TMP_SUFFIX = '.enricher-tmp'
+
+# Seconds without new filesystem events before queued files are enriched
+WATCH_SETTLE = 10
+
+_ID_ALPHABET = frozenset(string.ascii_letters + string.digits + '-_')
+_VIDEO_ID_RE = re.compile(r'-\s*([A-Za-z0-9_-]{11})\.mp3\Z')
+_PAREN_RE = re.compile(r'\s*[\(\[].*?[\)\]]')
+_PUNCT_RE = re.compile(r'[^\w\s]')
+# ASCII characters matched by _PUNCT_RE, removed with bytes.translate
+_ASCII_PUNCT = bytes(
+    c for c in range(0x80) if not (chr(c).isalnum() or chr(c) == '_' or chr(c).isspace())
+)
+
 
 def extract_video_id(filename: str) -> str | None:
     """
@@ -32,98 +74,544 @@ def extract_video_id(filename: str) -> str | None:
     Format: "Artist - Title - VIDEO_ID.mp3"
     Video IDs are 11 characters: alphanumeric plus - and _
     """
-    match = re.search(r'-\s*([a-zA-Z0-9_-]{11})\.mp3$', filename)
-    if match:
-        return match.group(1)
-    return None
+    if not filename.endswith('.mp3') or len(filename) < 16:
+        return None
+
+    candidate = filename[-15:-4]
+    if not all(c in _ID_ALPHABET for c in candidate):
+        return None
+
+    # Fast path for the usual "- VIDEO_ID.mp3" / "-VIDEO_ID.mp3" endings
+    if filename[-16] == '-' or filename[-17:-15] == '- ':
+        return candidate
+
+    # Fall back to the regex for unusual whitespace between dash and ID
+    match = _VIDEO_ID_RE.search(filename)
+    return match.group(1) if match else None
 
 
 def normalize_title(title: str) -> str:
     """Normalize a title for comparison by removing punctuation and lowercasing."""
-    title = re.sub(r'\s*[\(\[].*?[\)\]]', '', title)
-    title = re.sub(r'[^\w\s]', '', title.lower())
+    title = _PAREN_RE.sub('', title).lower()
+    if title.isascii():
+        title = title.encode('ascii').translate(None, _ASCII_PUNCT).decode('ascii')
+    else:
+        title = _PUNCT_RE.sub('', title)
     return ' '.join(title.split())
 
 
-def get_track_metadata(ytmusic: YTMusic, video_id: str) -> dict | None:
+class MetadataCache:
+    """
+    Persistent SQLite cache of YouTube Music lookups and scan results.
+    Stores resolved track numbers per video ID and track listings per album ID.
+    Lookups that found no track number or failed are kept for a shorter TTL.
+    Also remembers which files already had a track number at a given mtime.
+    """
+
+    def __init__(self, path: str, ttl: int = 30 * 86400, negative_ttl: int = 86400):
+        db_path = Path(path).expanduser()
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS video_cache ('
+                'video_id TEXT PRIMARY KEY, track_number INT, total_tracks INT, fetched_at INT, '
+                'failed INT DEFAULT 0)'
+            )
+            # Databases created before failed lookups were told apart
+            columns = {row[1] for row in self._conn.execute('PRAGMA table_info(video_cache)')}
+            if 'failed' not in columns:
+                self._conn.execute('ALTER TABLE video_cache ADD COLUMN failed INT DEFAULT 0')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS album_cache ('
+                'album_id TEXT PRIMARY KEY, tracks_json BLOB, fetched_at INT)'
+            )
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS seen ('
+                'path TEXT PRIMARY KEY, mtime REAL, has_trck INT)'
+            )
+
+    def get_video(self, video_id: str) -> tuple[bool, dict | None]:
+        """
+        Return (hit, metadata) for a video; hit is False if missing or expired.
+        metadata is None for lookups that failed outright.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT track_number, total_tracks, fetched_at, failed FROM video_cache '
+                'WHERE video_id = ?',
+                (video_id,)
+            ).fetchone()
+        if not row:
+            return False, None
+        track_number, total_tracks, fetched_at, failed = row
+        ttl = self.ttl if track_number is not None else self.negative_ttl
+        if time.time() - fetched_at > ttl:
+            return False, None
+        if failed:
+            return True, None
+        return True, {'track_number': track_number, 'total_tracks': total_tracks}
+
+    def put_video(self, video_id: str, metadata: dict | None):
+        """Store metadata for a video; None records a failed lookup."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO video_cache '
+                '(video_id, track_number, total_tracks, fetched_at, failed) VALUES (?, ?, ?, ?, ?)',
+                (
+                    video_id,
+                    metadata.get('track_number') if metadata else None,
+                    metadata.get('total_tracks') if metadata else None,
+                    int(time.time()),
+                    0 if metadata else 1,
+                )
+            )
+
+    def get_album(self, album_id: str) -> list | None:
+        """Return cached album tracks, or None if missing or expired."""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT tracks_json, fetched_at FROM album_cache WHERE album_id = ?',
+                (album_id,)
+            ).fetchone()
+        if not row or time.time() - row[1] > self.ttl:
+            return None
+        return json.loads(row[0])
+
+    def put_album(self, album_id: str, tracks: list):
+        """Store the track listing of an album (only videoId and title are kept)."""
+        tracks_json = json.dumps([
+            {'videoId': track.get('videoId'), 'title': track.get('title', '')}
+            for track in tracks
+        ])
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO album_cache VALUES (?, ?, ?)',
+                (album_id, tracks_json, int(time.time()))
+            )
+
+    def get_tagged_files(self, paths: list | None = None) -> dict:
+        """
+        Return {path: mtime} for files last seen with a track number.
+        Only the given paths are looked up when paths is not None.
+        """
+        query = 'SELECT path, mtime FROM seen WHERE has_trck = 1'
+        with self._lock:
+            if paths is None:
+                return dict(self._conn.execute(query).fetchall())
+
+            tagged = {}
+            # Stay below SQLite's limit on bound parameters
+            for start in range(0, len(paths), 500):
+                chunk = paths[start:start + 500]
+                placeholders = ', '.join('?' * len(chunk))
+                tagged.update(self._conn.execute(
+                    f'{query} AND path IN ({placeholders})', chunk
+                ).fetchall())
+            return tagged
+
+    def put_seen(self, rows: list):
+        """Store (path, mtime, has_trck) scan results."""
+        with self._lock, self._conn:
+            self._conn.executemany('INSERT OR REPLACE INTO seen VALUES (?, ?, ?)', rows)
+
+    def prune_seen(self, paths: set):
+        """Drop scan results for files that are not in paths any more."""
+        with self._lock, self._conn:
+            stale = [
+                (path,) for (path,) in self._conn.execute('SELECT path FROM seen')
+                if path not in paths
+            ]
+            self._conn.executemany('DELETE FROM seen WHERE path = ?', stale)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class LookupMemo:
+    """
+    Thread-safe in-memory memo shared by the lookups of a single scan.
+    Each key is fetched at most once; concurrent callers wait for the first fetch.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._futures = {}
+
+    def get(self, key, fetch):
+        with self._lock:
+            future = self._futures.get(key)
+            is_owner = future is None
+            if is_owner:
+                future = self._futures[key] = Future()
+
+        if is_owner:
+            try:
+                future.set_result(fetch())
+            except Exception as e:
+                future.set_exception(e)
+        return future.result()
+
+
+class TokenBucket:
+    """Thread-safe token bucket allowing `rate` calls per second on average."""
+
+    def __init__(self, rate: float, capacity: float = 1):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self):
+        """Block until a token is available."""
+        if self.rate <= 0:
+            return
+
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # Reserve the token even if it is not there yet so waiting threads queue up
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0
+
+        if wait:
+            time.sleep(wait)
+
+
+class ServerError(Exception):
+    """Raised for 5xx responses that are still failing after urllib3's retries."""
+
+    def __init__(self, status_code: int):
+        super().__init__(f"YouTube Music returned HTTP {status_code}")
+        self.status_code = status_code
+
+
+class ThrottledError(ServerError):
+    """Raised for 429/503 responses that are still failing after urllib3's retries."""
+
+    def __init__(self, status_code: int):
+        Exception.__init__(self, f"YouTube Music is throttling requests (HTTP {status_code})")
+        self.status_code = status_code
+
+
+def raise_if_throttled(response: requests.Response, *args, **kwargs):
+    """
+    Session response hook raising ThrottledError for 429/503 and ServerError for other 5xx.
+    Runs before ytmusicapi parses the body, which is often not JSON on these responses.
+    """
+    if response.status_code in THROTTLE_STATUSES:
+        raise ThrottledError(response.status_code)
+    if response.status_code >= 500:
+        raise ServerError(response.status_code)
+
+
+def is_throttled(error: Exception) -> bool:
+    """Check whether an API error is a 429/503 response worth backing off for."""
+    return isinstance(error, ThrottledError)
+
+
+def is_transient(error: Exception) -> bool:
+    """
+    Check whether an API error may go away on retry: network errors, throttling
+    and 5xx server responses. Anything else (e.g. removed videos) is permanent.
+    """
+    return isinstance(error, (requests.RequestException, ServerError))
+
+
+class ThrottledYTMusic:
+    """
+    Wrap YTMusic so every API call waits for the token bucket
+    and is retried with exponential backoff when throttled.
+    Setting stop cuts the backoff short and re-raises the last error.
+    """
+
+    def __init__(
+        self,
+        ytmusic: YTMusic,
+        bucket: TokenBucket,
+        max_attempts: int = 5,
+        stop: threading.Event | None = None,
+    ):
+        self._ytmusic = ytmusic
+        self._bucket = bucket
+        self._max_attempts = max_attempts
+        self._stop = stop or threading.Event()
+
+    def __getattr__(self, name):
+        attr = getattr(self._ytmusic, name)
+        if not callable(attr):
+            return attr
+        return partial(self._call, attr)
+
+    def _call(self, func, *args, **kwargs):
+        for attempt in range(self._max_attempts):
+            self._bucket.take()
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                if attempt == self._max_attempts - 1 or not is_throttled(e):
+                    raise
+                if self._stop.wait(min(60, 2 ** attempt + random.random())):
+                    raise
+
+
+def create_session(concurrency: int = 8) -> requests.Session:
+    """
+    Create a keep-alive HTTP session for YTMusic.
+    The connection pool is sized for the lookup threads and transient server errors
+    are retried with backoff; throttling that outlasts the retries raises ThrottledError.
+    """
+    retry = Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=frozenset({'GET', 'POST'}),
+        raise_on_status=False,
+        # Retry-After can ask for minutes; ThrottledYTMusic backs off instead, and stops on SIGTERM
+        respect_retry_after_header=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=16,
+        pool_maxsize=max(32, concurrency),
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.hooks['response'].append(raise_if_throttled)
+    # YTMusic applies a 30 second timeout only to sessions it creates itself
+    session.request = partial(session.request, timeout=30)
+    return session
+
+
+def fetch_album_tracks(ytmusic: YTMusic, album_id: str, cache: MetadataCache | None = None) -> tuple:
+    """
+    Get the track listing of an album, from the cache when possible.
+    Returns (video_to_idx, normalized_titles): a dict of video ID to 1-based track
+    number and the normalized titles in album order. Both are built once per album
+    rather than once per looked-up track.
+    """
+    tracks = cache.get_album(album_id) if cache else None
+    if tracks is None:
+        album_data = ytmusic.get_album(album_id)
+        tracks = album_data.get('tracks', []) if album_data else []
+        if cache and tracks:
+            cache.put_album(album_id, tracks)
+    video_to_idx = {}
+    for idx, track in enumerate(tracks, start=1):
+        # Keep the first position if a video appears on the album twice
+        if track.get('videoId'):
+            video_to_idx.setdefault(track['videoId'], idx)
+    normalized_titles = [normalize_title(track.get('title', '')) for track in tracks]
+    return video_to_idx, normalized_titles
+
+
+def get_track_metadata(
+    ytmusic: YTMusic,
+    video_id: str,
+    cache: MetadataCache | None = None,
+    memo: LookupMemo | None = None,
+) -> dict | None:
     """
     Query YouTube Music API for track number.
     Returns dict with 'track_number' and 'total_tracks' keys.
+    Results are read from and written to the cache when one is given.
+    Pass the same memo to every lookup of a scan so shared albums are fetched once.
     """
+    memo = memo or LookupMemo()
+    if cache:
+        hit, cached = cache.get_video(video_id)
+        if hit:
+            return cached
+
     try:
         result = {
             'track_number': None,
             'total_tracks': None,
         }
 
-        watch_data = ytmusic.get_watch_playlist(video_id)
+        # Only the first entry (the track itself) is used; limit=1 stops ytmusicapi
+        # from requesting continuation pages to fill up the related-tracks queue
+        watch_data = memo.get(
+            ('watch', video_id),
+            lambda: ytmusic.get_watch_playlist(video_id, limit=1)
+        )
         if not watch_data or not watch_data.get('tracks'):
+            # Unknown or removed videos are negative-cached like unmatched tracks
+            if cache:
+                cache.put_video(video_id, None)
             return None
 
         track_info = watch_data['tracks'][0]
         title = track_info.get('title', '')
-        normalized_title = normalize_title(title)
 
         album = track_info.get('album', {})
         album_id = album.get('id') if album else None
 
+        # Only cache definitive answers, not transient album lookup errors
+        cacheable = True
+
         if album_id:
             try:
-                album_data = ytmusic.get_album(album_id)
-                if album_data:
-                    tracks = album_data.get('tracks', [])
-                    result['total_tracks'] = len(tracks)
+                video_to_idx, track_titles = memo.get(
+                    ('album', album_id),
+                    lambda: fetch_album_tracks(ytmusic, album_id, cache)
+                )
 
-                    for idx, track in enumerate(tracks, start=1):
-                        if track.get('videoId') == video_id:
-                            result['track_number'] = idx
-                            break
+                if track_titles:
+                    result['total_tracks'] = len(track_titles)
+                    result['track_number'] = video_to_idx.get(video_id)
 
                     if result['track_number'] is None:
-                        for idx, track in enumerate(tracks, start=1):
-                            track_title = normalize_title(track.get('title', ''))
+                        # Only fall back to title matching when the video ID is not listed
+                        normalized_title = normalize_title(title)
+                        for idx, track_title in enumerate(track_titles, start=1):
                             if track_title == normalized_title:
                                 result['track_number'] = idx
                                 break
                             if normalized_title in track_title or track_title in normalized_title:
                                 result['track_number'] = idx
                                 break
-            except Exception:
-                pass
+            except Exception as e:
+                cacheable = not is_transient(e)
+
+        if cache and cacheable:
+            cache.put_video(video_id, result)
 
         return result
 
     except Exception as e:
         print(f"  Error fetching metadata: {e}")
+        if cache and not is_transient(e):
+            cache.put_video(video_id, None)
         return None
 
 
 def write_tags(filepath: str, track_number: int | None, total_tracks: int | None) -> bool:
-    """Write track number to MP3 file's ID3 tags."""
+    """
+    Write track number to MP3 file's ID3 tags.
+    Tags are written to a temporary copy that then atomically replaces the file,
+    so an interrupted write never leaves a half-written MP3 behind. The copy keeps
+    the original owner where permitted. Hard-linked files are saved in place so
+    the links are not broken.
+    """
+    if track_number is None:
+        return False
+
+    if total_tracks:
+        track_str = f"{track_number}/{total_tracks}"
+    else:
+        track_str = str(track_number)
+
+    tmp_path = filepath + TMP_SUFFIX
     try:
-        try:
-            tags = ID3(filepath)
-        except ID3NoHeaderError:
-            tags = ID3()
+        st = os.stat(filepath)
+        in_place = st.st_nlink > 1
+        target = filepath if in_place else tmp_path
+        if not in_place:
+            shutil.copy2(filepath, tmp_path)
+
+        with open(target, 'r+b') as f:
+            try:
+                tags = ID3(f)
+            except ID3NoHeaderError:
+                tags = ID3()
 
-        if track_number is None:
-            return False
+            tags['TRCK'] = TRCK(encoding=3, text=track_str)
+            tags.save(f)
+            f.flush()
+            os.fsync(f.fileno())
 
-        if total_tracks:
-            track_str = f"{track_number}/{total_tracks}"
-        else:
-            track_str = str(track_number)
-        tags['TRCK'] = TRCK(encoding=3, text=track_str)
-        tags.save(filepath)
+        if not in_place:
+            try:
+                os.chown(tmp_path, st.st_uid, st.st_gid)
+            except PermissionError:
+                pass
+            os.replace(tmp_path, filepath)
         return True
 
     except Exception as e:
         print(f"  Error writing tags: {e}")
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
         return False
 
 
+_TEXT_ENCODINGS = ('latin-1', 'utf-16', 'utf-16-be', 'utf-8')
+
+
+def _syncsafe(data: bytes) -> int:
+    """Decode a 4-byte ID3v2 syncsafe integer."""
+    return (data[0] << 21) | (data[1] << 14) | (data[2] << 7) | data[3]
+
+
+def _read_trck_fast(filepath: str) -> str | None:
+    """
+    Read the TRCK frame by walking ID3v2.3/2.4 frame headers directly,
+    seeking past every other frame body instead of decoding it.
+    Falls back to the ID3v1.1 track byte like mutagen does.
+    Raises ValueError for tag layouts that need a full mutagen parse.
+    """
+    with open(filepath, 'rb') as f:
+        header = f.read(10)
+        if len(header) < 10 or header[:3] != b'ID3':
+            raise ValueError("No ID3v2 header")
+
+        major, flags = header[3], header[5]
+        # Unsynchronisation and extended headers are left to mutagen
+        if major not in (3, 4) or flags & 0xC0:
+            raise ValueError("Unsupported ID3v2 layout")
+
+        tag_end = 10 + _syncsafe(header[6:10])
+        pos = 10
+        while pos + 10 <= tag_end:
+            frame = f.read(10)
+            if len(frame) < 10 or frame[0] == 0:
+                break  # Padding or truncated file
+            frame_id = frame[:4]
+            if not (frame_id.isalnum() and frame_id.isupper()):
+                raise ValueError("Malformed frame header")
+
+            size = _syncsafe(frame[4:8]) if major == 4 else int.from_bytes(frame[4:8], 'big')
+            if frame_id == b'TRCK':
+                # Compressed, encrypted, grouped or unsynchronised frames
+                if frame[9] & (0x4F if major == 4 else 0xE0):
+                    raise ValueError("Encoded TRCK frame")
+                data = f.read(size)
+                if not data or data[0] >= len(_TEXT_ENCODINGS):
+                    raise ValueError("Invalid TRCK frame")
+                text = data[1:].decode(_TEXT_ENCODINGS[data[0]])
+                return '/'.join(value for value in text.split('\x00') if value)
+
+            f.seek(size, os.SEEK_CUR)
+            pos += 10 + size
+
+        try:
+            f.seek(-128, os.SEEK_END)
+        except OSError:
+            return None
+        v1 = f.read(128)
+        if v1[:3] == b'TAG' and v1[125] == 0 and v1[126]:
+            return str(v1[126])
+    return None
+
+
 def get_existing_track_number(filepath: str) -> str | None:
     """Get existing track number from file."""
+    try:
+        return _read_trck_fast(filepath) or None
+    except ValueError:
+        pass
+    except Exception:
+        return None
+
     try:
         tags = ID3(filepath)
         trck = tags.get('TRCK')
@@ -136,44 +624,147 @@ def get_existing_track_number(filepath: str) -> str | None:
     return None
 
 
-def scan_folder(folder_path: str, dry_run: bool = False) -> dict:
+def iter_mp3_files(root: str, remove_stale_tmp: bool = False):
+    """
+    Recursively yield os.DirEntry objects for MP3 files below root.
+    Symlinked directories are not followed and unreadable directories are skipped.
+    With remove_stale_tmp, temporary files left by an interrupted write_tags are deleted;
+    only do this while no tags are being written.
+    """
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.name.endswith('.mp3'):
+                        yield entry
+                    elif remove_stale_tmp and entry.name.endswith(TMP_SUFFIX):
+                        try:
+                            os.remove(entry.path)
+                        except OSError:
+                            pass
+        except OSError:
+            continue
+
+
+def classify_file(mp3_file: os.DirEntry, tagged_files: dict | None = None) -> tuple | None:
+    """
+    First-pass check of a single file, safe to run on a worker thread.
+    Returns (path, mtime, existing_track, video_id), or None if the file can be
+    skipped because it is unchanged since it was last seen with a track number.
+    mtime is only looked up when tagged_files is given.
+    """
+    path = mp3_file.path
+    mtime = None
+    if tagged_files is not None:
+        try:
+            mtime = mp3_file.stat().st_mtime
+        except OSError:
+            return None
+        if tagged_files.get(path) == mtime:
+            return None
+
+    existing_track = get_existing_track_number(path)
+    video_id = None if existing_track else extract_video_id(mp3_file.name)
+    return path, mtime, existing_track, video_id
+
+
+def map_bounded(executor: ThreadPoolExecutor, fn, items, window: int):
+    """
+    Like executor.map, but with at most window calls in flight, so items
+    is consumed lazily instead of being submitted all at once.
+    """
+    items = iter(items)
+    pending = deque(executor.submit(fn, item) for item in islice(items, window))
+    while pending:
+        result = pending.popleft().result()
+        for item in islice(items, 1):
+            pending.append(executor.submit(fn, item))
+        yield result
+
+
+def relative_path(path: str, root: str) -> str:
     """
-    Scan folder recursively for MP3 files missing track numbers and enrich them.
-    Only calls API for files that need enrichment.
+    Return path relative to root by slicing off the root prefix.
+    Falls back to os.path.relpath when path does not start with root plus a separator.
     """
-    stats = {
+    prefix = root if root.endswith(os.sep) else root + os.sep
+    if path.startswith(prefix):
+        return path[len(prefix):]
+    return os.path.relpath(path, root)
+
+
+def new_stats() -> dict:
+    """Return an empty statistics dict."""
+    return {
         'scanned': 0,
         'needs_enrichment': 0,
         'enriched': 0,
         'failed': 0,
         'no_video_id': 0,
+        'interrupted': False,
     }
 
-    folder = Path(folder_path)
-    if not folder.exists():
-        print(f"Error: Folder not found: {folder_path}")
-        return stats
 
-    # Recursive glob
-    mp3_files = list(folder.rglob('*.mp3'))
-    if not mp3_files:
-        print(f"No MP3 files found in {folder_path}")
-        return stats
+def enrich_files(
+    mp3_files,
+    folder: Path,
+    dry_run: bool = False,
+    concurrency: int = 8,
+    rate_limit: float = 4.0,
+    cache: MetadataCache | None = None,
+    tagged_files: dict | None = None,
+    stop: threading.Event | None = None,
+) -> dict:
+    """
+    Enrich the given MP3 DirEntry objects that are missing track numbers.
+    Only calls API for files that need enrichment; lookups run in parallel.
+    Paths are printed relative to folder. tagged_files defaults to the whole
+    seen index of the cache; pass a smaller lookup when only a few files are given.
+    Once stop is set, pending work is cancelled and stats['interrupted'] is set.
+    """
+    stats = new_stats()
 
     # First pass: find files needing enrichment (no API calls)
+    # Files unchanged since they were last seen with a track number skip the ID3 parse
+    if not cache:
+        tagged_files = None
+    elif tagged_files is None:
+        tagged_files = cache.get_tagged_files()
+    seen_rows = []
     files_to_enrich = []
-    for mp3_file in mp3_files:
-        stats['scanned'] += 1
-        existing_track = get_existing_track_number(str(mp3_file))
-        if existing_track:
-            continue
+    with ThreadPoolExecutor(max_workers=SCAN_WORKERS) as executor:
+        classify = partial(classify_file, tagged_files=tagged_files)
+        for result in map_bounded(executor, classify, mp3_files, SCAN_WORKERS * 4):
+            if stop and stop.is_set():
+                stats['interrupted'] = True
+                executor.shutdown(cancel_futures=True)
+                break
 
-        video_id = extract_video_id(mp3_file.name)
-        if not video_id:
-            stats['no_video_id'] += 1
-            continue
+            stats['scanned'] += 1
+            if result is None:
+                continue
+
+            path, mtime, existing_track, video_id = result
+            if cache:
+                seen_rows.append((path, mtime, 1 if existing_track else 0))
+            if existing_track:
+                continue
+
+            if not video_id:
+                stats['no_video_id'] += 1
+                continue
 
-        files_to_enrich.append((mp3_file, video_id))
+            files_to_enrich.append((path, video_id))
+
+    if seen_rows:
+        cache.put_seen(seen_rows)
+
+    if not stats['scanned'] or stats['interrupted']:
+        return stats
 
     stats['needs_enrichment'] = len(files_to_enrich)
 
@@ -184,45 +775,260 @@ def scan_folder(folder_path: str, dry_run: bool = False) -> dict:
     print(f"Scanned {stats['scanned']} files, {len(files_to_enrich)} need enrichment")
     print()
 
-    # Second pass: enrich files that need it
-    ytmusic = YTMusic()
+    # Second pass: fetch metadata in parallel, write tags as results arrive
+    root = str(folder)
+    ytmusic = ThrottledYTMusic(
+        YTMusic(requests_session=create_session(concurrency)),
+        TokenBucket(rate_limit),
+        stop=stop,
+    )
+    memo = LookupMemo()
 
-    for i, (mp3_file, video_id) in enumerate(files_to_enrich, start=1):
-        rel_path = mp3_file.relative_to(folder)
-        print(f"[{i}/{len(files_to_enrich)}] {rel_path}")
-        print(f"  Fetching metadata for video ID: {video_id}")
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        futures = {}
+        for path, video_id in files_to_enrich:
+            if stop and stop.is_set():
+                break
+            futures[executor.submit(get_track_metadata, ytmusic, video_id, cache, memo)] = (path, video_id)
 
-        metadata = get_track_metadata(ytmusic, video_id)
+        for i, future in enumerate(as_completed(futures), start=1):
+            if stop and stop.is_set():
+                stats['interrupted'] = True
+                print("Stopping: remaining lookups cancelled")
+                executor.shutdown(wait=False, cancel_futures=True)
+                break
 
-        if not metadata:
-            print("  Failed: Could not fetch metadata from YouTube Music")
-            stats['failed'] += 1
-            continue
+            path, video_id = futures[future]
+            rel_path = relative_path(path, root)
+            print(f"[{i}/{len(files_to_enrich)}] {rel_path}")
+            print(f"  Fetched metadata for video ID: {video_id}")
 
-        track_num = metadata.get('track_number')
-        total_tracks = metadata.get('total_tracks')
+            metadata = future.result()
 
-        if track_num is None:
-            print("  Failed: No track number found in album")
-            stats['failed'] += 1
-            continue
+            if not metadata:
+                print("  Failed: Could not fetch metadata from YouTube Music")
+                stats['failed'] += 1
+                continue
 
-        track_str = f"{track_num}/{total_tracks}" if total_tracks else str(track_num)
-        print(f"  Found track number: {track_str}")
+            track_num = metadata.get('track_number')
+            total_tracks = metadata.get('total_tracks')
 
-        if dry_run:
-            print("  Dry run: Would write tags")
-            stats['enriched'] += 1
-        else:
-            if write_tags(str(mp3_file), track_num, total_tracks):
-                print("  Tags written successfully")
+            if track_num is None:
+                print("  Failed: No track number found in album")
+                stats['failed'] += 1
+                continue
+
+            track_str = f"{track_num}/{total_tracks}" if total_tracks else str(track_num)
+            print(f"  Found track number: {track_str}")
+
+            if dry_run:
+                print("  Dry run: Would write tags")
                 stats['enriched'] += 1
             else:
-                stats['failed'] += 1
+                if write_tags(path, track_num, total_tracks):
+                    print("  Tags written successfully")
+                    stats['enriched'] += 1
+                else:
+                    stats['failed'] += 1
 
     return stats
 
 
+def scan_folder(
+    folder_path: str,
+    dry_run: bool = False,
+    concurrency: int = 8,
+    rate_limit: float = 4.0,
+    cache: MetadataCache | None = None,
+    stop: threading.Event | None = None,
+) -> dict:
+    """Scan folder recursively for MP3 files missing track numbers and enrich them."""
+    folder = Path(folder_path)
+    if not folder.exists():
+        print(f"Error: Folder not found: {folder_path}")
+        return new_stats()
+
+    walked = set()
+
+    def walk():
+        for mp3_file in iter_mp3_files(str(folder), remove_stale_tmp=not dry_run):
+            walked.add(mp3_file.path)
+            yield mp3_file
+
+    stats = enrich_files(
+        walk(),
+        folder,
+        dry_run=dry_run,
+        concurrency=concurrency,
+        rate_limit=rate_limit,
+        cache=cache,
+        stop=stop,
+    )
+    if stats['interrupted']:
+        return stats
+    if not stats['scanned']:
+        print(f"No MP3 files found in {folder_path}")
+    elif cache:
+        # Forget deleted and renamed files so the seen index doesn't grow forever
+        cache.prune_seen(walked)
+    return stats
+
+
+def iter_changed_files(paths: set):
+    """
+    Yield MP3 DirEntry objects for a set of changed paths, each file at most once.
+    Directories are walked recursively; files are looked up in their parent directory.
+    """
+    yielded = set()
+    by_parent = {}
+    for path in paths:
+        if os.path.isdir(path):
+            for entry in iter_mp3_files(path):
+                if entry.path not in yielded:
+                    yielded.add(entry.path)
+                    yield entry
+        elif path.endswith('.mp3'):
+            by_parent.setdefault(os.path.dirname(path), set()).add(path)
+
+    for parent, names in by_parent.items():
+        try:
+            with os.scandir(parent) as it:
+                for entry in it:
+                    if entry.path in names and entry.path not in yielded and entry.is_file():
+                        yield entry
+        except OSError:
+            continue
+
+
+def is_settled(mp3_file: os.DirEntry) -> bool:
+    """
+    Check that a file is no longer being written: every write bumps its mtime,
+    so it is settled once that is WATCH_SETTLE seconds old.
+    """
+    try:
+        mtime = os.stat(mp3_file.path).st_mtime
+    except OSError:
+        return False
+    return time.time() - mtime >= WATCH_SETTLE
+
+
+class NewFileHandler(FileSystemEventHandler):
+    """
+    Queue MP3 files and directories that appear in the music folder.
+    Writes to queued files are queued again so the settle timer restarts.
+    """
+
+    def __init__(self, changes: queue.Queue):
+        self.changes = changes
+
+    def _queue(self, path: str, is_directory: bool):
+        if is_directory or path.endswith('.mp3'):
+            self.changes.put(path)
+
+    def on_created(self, event):
+        self._queue(os.fsdecode(event.src_path), event.is_directory)
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self._queue(os.fsdecode(event.src_path), False)
+
+    def on_closed(self, event):
+        self._queue(os.fsdecode(event.src_path), False)
+
+    def on_moved(self, event):
+        # Our own atomic tag writes show up as moves from the temporary file
+        if os.fsdecode(event.src_path).endswith(TMP_SUFFIX):
+            return
+        self._queue(os.fsdecode(event.dest_path), event.is_directory)
+
+
+def watch_worker(
+    changes: queue.Queue,
+    folder: str,
+    scan_lock: threading.Lock,
+    dry_run: bool = False,
+    concurrency: int = 8,
+    rate_limit: float = 4.0,
+    cache: MetadataCache | None = None,
+    stop: threading.Event | None = None,
+):
+    """
+    Enrich files queued by NewFileHandler.
+    Waits until no new events arrived for WATCH_SETTLE seconds so downloads can finish;
+    files that are still being written are put back on the queue.
+    """
+    while True:
+        pending = {changes.get()}
+        while True:
+            try:
+                pending.add(changes.get(timeout=WATCH_SETTLE))
+            except queue.Empty:
+                break
+
+        settled = []
+        for mp3_file in iter_changed_files(pending):
+            if is_settled(mp3_file):
+                settled.append(mp3_file)
+            else:
+                changes.put(mp3_file.path)
+        if not settled:
+            continue
+
+        with scan_lock:
+            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            print(f"[{timestamp}] Detected {len(settled)} new file(s)")
+            try:
+                tagged_files = None
+                if cache:
+                    tagged_files = cache.get_tagged_files([mp3_file.path for mp3_file in settled])
+                stats = enrich_files(
+                    settled,
+                    Path(folder),
+                    dry_run=dry_run,
+                    concurrency=concurrency,
+                    rate_limit=rate_limit,
+                    cache=cache,
+                    tagged_files=tagged_files,
+                    stop=stop,
+                )
+                print_stats(stats)
+            except Exception as e:
+                print(f"  Error enriching new files: {e}")
+            print("-" * 50)
+
+
+def start_watcher(
+    folder: str,
+    scan_lock: threading.Lock,
+    dry_run: bool = False,
+    concurrency: int = 8,
+    rate_limit: float = 4.0,
+    cache: MetadataCache | None = None,
+    stop: threading.Event | None = None,
+) -> Observer:
+    """Start a filesystem observer and worker thread that enrich new files as they appear."""
+    changes = queue.Queue()
+    observer = Observer()
+    observer.schedule(NewFileHandler(changes), str(Path(folder)), recursive=True)
+    observer.daemon = True
+    observer.start()
+
+    worker = threading.Thread(
+        target=watch_worker,
+        args=(changes, folder, scan_lock),
+        kwargs={
+            'dry_run': dry_run,
+            'concurrency': concurrency,
+            'rate_limit': rate_limit,
+            'cache': cache,
+            'stop': stop,
+        },
+        daemon=True,
+    )
+    worker.start()
+    return observer
+
+
 def print_stats(stats: dict):
     """Print scan statistics."""
     print()
@@ -234,26 +1040,81 @@ def print_stats(stats: dict):
     print(f"  Failed:               {stats['failed']}")
     if stats['no_video_id']:
         print(f"  No video ID:          {stats['no_video_id']}")
+    if stats['interrupted']:
+        print("  Interrupted by shutdown")
     print("=" * 50)
 
 
-def run_daemon(folder: str, interval: int, dry_run: bool = False):
-    """Run continuously, scanning at the specified interval."""
+def run_daemon(
+    folder: str,
+    interval: int,
+    dry_run: bool = False,
+    concurrency: int = 8,
+    rate_limit: float = 4.0,
+    cache: MetadataCache | None = None,
+    watch: bool = True,
+):
+    """
+    Run continuously, scanning at the specified interval.
+    When watching, new files are enriched as they appear and the full scan is a safety net.
+    """
     print(f"Starting daemon mode")
     print(f"  Music folder: {folder}")
     print(f"  Scan interval: {interval} seconds ({interval // 60} minutes)")
+    print(f"  Concurrency: {concurrency}")
+    print(f"  Rate limit: {rate_limit} requests/second")
+    print(f"  Watching for new files: {'yes' if watch else 'no'}")
     print()
 
-    while True:
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        print(f"[{timestamp}] Starting scan...")
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
 
-        stats = scan_folder(folder, dry_run=dry_run)
-        print_stats(stats)
+    scan_lock = threading.Lock()
+    observer = None
+    if watch and Path(folder).is_dir():
+        try:
+            observer = start_watcher(
+                folder,
+                scan_lock,
+                dry_run=dry_run,
+                concurrency=concurrency,
+                rate_limit=rate_limit,
+                cache=cache,
+                stop=stop,
+            )
+        except OSError as e:
+            # e.g. the inotify watch limit is exhausted
+            print(f"Warning: could not watch {folder} ({e}), relying on periodic scans")
+            print()
 
+    while not stop.is_set():
+        with scan_lock:
+            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            print(f"[{timestamp}] Starting scan...")
+
+            stats = scan_folder(
+                folder,
+                dry_run=dry_run,
+                concurrency=concurrency,
+                rate_limit=rate_limit,
+                cache=cache,
+                stop=stop,
+            )
+            print_stats(stats)
+
+        if stop.is_set():
+            break
         print(f"\nNext scan in {interval} seconds...")
         print("-" * 50)
-        time.sleep(interval)
+        stop.wait(interval)
+
+    print("Received SIGTERM, shutting down")
+    if observer:
+        observer.stop()
+        observer.join()
+    # Let an in-progress batch of new files finish before exiting
+    with scan_lock:
+        pass
 
 
 def main():
@@ -279,8 +1140,36 @@ def main():
     parser.add_argument(
         '--interval', '-i',
         type=int,
-        default=int(os.environ.get('SCAN_INTERVAL', 3600)),
-        help='Seconds between scans in daemon mode (default: 3600 = 1 hour)'
+        default=int(os.environ.get('SCAN_INTERVAL', 86400)),
+        help='Seconds between full scans in daemon mode (default: 86400 = 24 hours)'
+    )
+    parser.add_argument(
+        '--no-watch',
+        action='store_true',
+        default=os.environ.get('WATCH', 'true').lower() in ('0', 'false', 'no'),
+        help='Only rely on periodic full scans instead of watching for new files (or WATCH=false env)'
+    )
+    parser.add_argument(
+        '--concurrency', '-c',
+        type=int,
+        default=int(os.environ.get('CONCURRENCY', 8)),
+        help='Number of parallel YouTube Music lookups (default: 8 or CONCURRENCY env)'
+    )
+    parser.add_argument(
+        '--rate-limit',
+        type=float,
+        default=float(os.environ.get('RATE_LIMIT', 4)),
+        help='Maximum YouTube Music requests per second (default: 4 or RATE_LIMIT env)'
+    )
+    parser.add_argument(
+        '--cache',
+        default=os.environ.get('CACHE_DB', '~/.cache/ytmusic_enricher.db'),
+        help='Path to the lookup cache database (default: ~/.cache/ytmusic_enricher.db or CACHE_DB env)'
+    )
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Always query YouTube Music instead of using the lookup cache'
     )
 
     args = parser.parse_args()
@@ -289,11 +1178,31 @@ def main():
         print("DRY RUN MODE - No changes will be made")
         print()
 
-    if args.daemon:
-        run_daemon(args.folder, args.interval, dry_run=args.dry_run)
-    else:
-        stats = scan_folder(args.folder, dry_run=args.dry_run)
-        print_stats(stats)
+    cache = None if args.no_cache else MetadataCache(args.cache)
+
+    try:
+        if args.daemon:
+            run_daemon(
+                args.folder,
+                args.interval,
+                dry_run=args.dry_run,
+                concurrency=args.concurrency,
+                rate_limit=args.rate_limit,
+                cache=cache,
+                watch=not args.no_watch,
+            )
+        else:
+            stats = scan_folder(
+                args.folder,
+                dry_run=args.dry_run,
+                concurrency=args.concurrency,
+                rate_limit=args.rate_limit,
+                cache=cache,
+            )
+            print_stats(stats)
+    finally:
+        if cache:
+            cache.close()
 
 
 if __name__ == '__main__':